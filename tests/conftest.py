@@ -0,0 +1,55 @@
+import socket
+import threading
+import time
+
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from homework.app import api
+
+SERVER_HOST = "127.0.0.1"
+
+
+def _wait_ready(host, port, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.05).close()
+            return
+        except OSError:
+            time.sleep(0.01)
+    raise RuntimeError(f"Server on {host}:{port} did not become ready")
+
+
+_server = None
+_server_thread = None
+
+
+def get_server():
+    """Process-local singleton: boot the API server at most once per process."""
+    global _server, _server_thread
+    if _server is None:
+        httpd = ThreadingHTTPServer((SERVER_HOST, 0), api.MainHTTPHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        _wait_ready(SERVER_HOST, httpd.server_address[1])
+        _server = httpd
+        _server_thread = thread
+    return _server
+
+
+@pytest.fixture(scope="session")
+def api_server():
+    """Boot the API server once per test session on an ephemeral port."""
+    global _server, _server_thread
+    httpd = get_server()
+    host, port = httpd.server_address
+    yield host, port
+    # shutdown() stops serve_forever and must come before the join; only
+    # close the listening socket once the serving thread has exited.
+    httpd.shutdown()
+    _server_thread.join(timeout=5)
+    httpd.server_close()
+    _server = None
+    _server_thread = None
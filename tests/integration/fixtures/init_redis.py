@@ -8,10 +8,14 @@ def init_redis():
 
     client = redis.Redis(host=host, port=port, db=0)
 
-    # Установим пример данных
-    client.set("i:1", '["books", "music"]')
-    client.set("i:2", '["travel", "sports"]')
-    client.set("i:3", '["movies", "tech"]')
+    # Установим пример данных одним запросом
+    client.mset(
+        {
+            "i:1": '["books", "music"]',
+            "i:2": '["travel", "sports"]',
+            "i:3": '["movies", "tech"]',
+        }
+    )
 
 
 if __name__ == "__main__":
@@ -1,21 +1,20 @@
-import unittest
-import subprocess
-import time
-import requests
-import threading
+import binascii
+import copy
+import http.client
 import os
-import signal
 import json
+import functools
 import hashlib
-import datetime
 import sys
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-from homework.app import api
+import orjson
+import pytest
 
+from homework.app import api
 
-SERVER_PORT = 8080
-SERVER_HOST = "localhost"
 
 FIXTURES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "fixtures")
 REQUEST_FIXTURES_DIR = os.path.join(FIXTURES_DIR, "requests")
@@ -23,151 +22,227 @@ RESPONSE_FIXTURES_DIR = os.path.join(FIXTURES_DIR, "responses")
 
 logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
 
+_redis_initialized = False
 
-class ServerThread(threading.Thread):
-    def __init__(self, *args, **kwargs):
-        super(ServerThread, self).__init__(*args, **kwargs)
-        self.process = None
-        self.stdout = ""
-        self.stderr = ""
-
-    def run(self):
-        env = os.environ.copy()
-        env["REDIS_HOST"] = os.getenv("REDIS_HOST", "localhost")
-        env["REDIS_PORT"] = os.getenv("REDIS_PORT", "6379")
-
-        command = ["python", "-m", "homework.app.api", "-p", str(SERVER_PORT)]
-        self.process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env=env,
-            preexec_fn=os.setsid,
-        )
-        time.sleep(2)
 
-    def stop(self):
-        if self.process:
-            os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
-            self.stdout, self.stderr = self.process.communicate()
-            self.process.wait()
+@functools.lru_cache(maxsize=16)
+def _user_token(account, login):
+    msg = (account + login + api.SALT).encode("utf-8")
+    digest = hashlib.blake2b(msg, digest_size=64).digest()
+    return binascii.hexlify(digest).decode()
 
 
-class TestIntegration(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        cls.init_redis()
+def _current_hour_bucket():
+    # time.strftime on the local struct_time skips building a datetime
+    # object; local time keeps the bucket in sync with check_auth.
+    return time.strftime("%Y%m%d%H", time.localtime())
 
-        cls.server_thread = ServerThread()
-        cls.server_thread.start()
-        time.sleep(2)
 
-    @classmethod
-    def tearDownClass(cls):
-        cls.server_thread.stop()
-        if cls.server_thread.stdout:
-            print("Server stdout:\n", cls.server_thread.stdout.decode())
-        if cls.server_thread.stderr:
-            print("Server stderr:\n", cls.server_thread.stderr.decode())
+@functools.lru_cache(maxsize=16)
+def _admin_token(hour_bucket):
+    digest = hashlib.blake2b(
+        (hour_bucket + api.ADMIN_SALT).encode("utf-8"), digest_size=64
+    ).digest()
+    return binascii.hexlify(digest).decode()
 
-    @staticmethod
-    def init_redis():
-        import redis
 
-        REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-        REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+@functools.lru_cache(maxsize=32)
+def _load_fixture_cached(fixture_type, filename):
+    if fixture_type == "request":
+        fixture_path = os.path.join(REQUEST_FIXTURES_DIR, filename)
+    elif fixture_type == "response":
+        fixture_path = os.path.join(RESPONSE_FIXTURES_DIR, filename)
+    else:
+        raise ValueError("Invalid fixture type. Use 'request' or 'response'.")
 
-        client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+    with open(fixture_path, "rb") as f:
+        return orjson.loads(f.read())
 
-        # Add test data to Redis
-        client.set("i:1", json.dumps(["books", "music"]))
-        client.set("i:2", json.dumps(["travel", "sports"]))
-        client.set("i:3", json.dumps(["movies", "tech"]))
-
-    def load_fixture(self, fixture_type, filename):
-        if fixture_type == "request":
-            fixture_path = os.path.join(REQUEST_FIXTURES_DIR, filename)
-        elif fixture_type == "response":
-            fixture_path = os.path.join(RESPONSE_FIXTURES_DIR, filename)
-        else:
-            raise ValueError("Invalid fixture type. Use 'request' or 'response'.")
-
-        with open(fixture_path, "r") as f:
-            return json.load(f)
-
-    def set_valid_auth(self, request):
-        if request.get("login") == api.ADMIN_LOGIN:
-            request["token"] = hashlib.sha512(
-                (datetime.datetime.now().strftime("%Y%m%d%H") + api.ADMIN_SALT).encode(
-                    "utf-8"
-                )
-            ).hexdigest()
-        else:
-            msg = (
-                request.get("account", "") + request.get("login", "") + api.SALT
-            ).encode("utf-8")
-            request["token"] = hashlib.sha512(msg).hexdigest()
-
-    def make_request(self, request):
-        url = f"http://{SERVER_HOST}:{SERVER_PORT}/method"
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(url, data=json.dumps(request), headers=headers)
-        return response.json()
-
-    def test_valid_online_score(self):
-        request_data = self.load_fixture("request", "valid_online_score_request.json")
-        expected_response = self.load_fixture(
-            "response", "expected_online_score_response.json"
+
+def load_fixture(fixture_type, filename):
+    # Tests mutate request fixtures (set_valid_auth writes "token"), so hand
+    # out a copy and keep the cached parse pristine.
+    return copy.deepcopy(_load_fixture_cached(fixture_type, filename))
+
+
+def set_valid_auth(request):
+    if request.get("login") == api.ADMIN_LOGIN:
+        request["token"] = _admin_token(_current_hour_bucket())
+    else:
+        request["token"] = _user_token(
+            request.get("account", ""), request.get("login", "")
         )
 
-        self.set_valid_auth(request_data)
 
-        response = self.make_request(request_data)
+@functools.lru_cache(maxsize=32)
+def _prepared_fixture_body(filename):
+    request = load_fixture("request", filename)
+    set_valid_auth(request)
+    return orjson.dumps(request)
 
-        self.assertEqual(response["code"], expected_response["code"])
-        self.assertIn("score", response["response"])
-        self.assertGreaterEqual(response["response"]["score"], 0)
 
-    def test_invalid_online_score(self):
-        request_data = self.load_fixture("request", "invalid_online_score_request.json")
+def prepare_body(source):
+    """Serialized, authenticated payload for a request source.
 
-        self.set_valid_auth(request_data)
+    Fixture filenames map to constant payloads (tokens are memoized), so
+    their serialized bytes are cached for the whole session; inline dicts
+    are prepared on the spot.
+    """
+    if isinstance(source, str):
+        return _prepared_fixture_body(source)
+    request = dict(source)
+    set_valid_auth(request)
+    return orjson.dumps(request)
 
-        response = self.make_request(request_data)
 
-        self.assertNotEqual(response["code"], api.OK)
-        self.assertIn("error", response)
+class TestIntegration:
+    conn = None
 
-    def test_valid_clients_interests(self):
-        request_data = self.load_fixture(
-            "request", "valid_clients_interests_request.json"
-        )
-        expected_response = self.load_fixture(
-            "response", "expected_clients_interests_response.json"
-        )
+    @pytest.fixture(autouse=True)
+    def _server(self, api_server):
+        self.host, self.port = api_server
 
-        self.set_valid_auth(request_data)
+    @classmethod
+    def setup_class(cls):
+        cls.init_redis()
+        # One persistent HTTP/1.1 connection for the whole class: it is
+        # opened lazily once the server port is known and reused by every
+        # test instead of a new socket per call.
+        cls.conn = None
 
-        response = self.make_request(request_data)
+    @classmethod
+    def teardown_class(cls):
+        if cls.conn is not None:
+            cls.conn.close()
 
-        self.assertEqual(response["code"], expected_response["code"])
-        self.assertEqual(len(response["response"]), len(expected_response["response"]))
-        for cid, interests in response["response"].items():
-            self.assertIn(cid, expected_response["response"])
-            self.assertEqual(interests, expected_response["response"][cid])
+    @staticmethod
+    def init_redis():
+        global _redis_initialized
+        if _redis_initialized:
+            return
 
-    def test_invalid_clients_interests(self):
-        request_data = self.load_fixture(
-            "request", "invalid_clients_interests_request.json"
-        )
+        import redis
+
+        REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+        REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 
-        self.set_valid_auth(request_data)
+        client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
 
-        response = self.make_request(request_data)
+        # Add test data to Redis in one round-trip
+        client.mset(
+            {
+                "i:1": json.dumps(["books", "music"]),
+                "i:2": json.dumps(["travel", "sports"]),
+                "i:3": json.dumps(["movies", "tech"]),
+            }
+        )
+        _redis_initialized = True
+
+    def make_request(self, source):
+        cls = type(self)
+        if cls.conn is None:
+            cls.conn = http.client.HTTPConnection(self.host, self.port, timeout=5)
+        cls.conn.request(
+            "POST",
+            "/method",
+            body=prepare_body(source),
+            headers={"Content-Type": "application/json"},
+        )
+        response = cls.conn.getresponse()
+        return orjson.loads(response.read())
+
+    def dispatch(self, sources):
+        """Fire independent requests concurrently, one connection per worker."""
+        # Serialize up front: repeated sources hit the prepared-body cache.
+        bodies = [prepare_body(source) for source in sources]
+
+        def post(body):
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=5)
+            try:
+                conn.request(
+                    "POST",
+                    "/method",
+                    body=body,
+                    headers={"Content-Type": "application/json"},
+                )
+                return orjson.loads(conn.getresponse().read())
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(post, bodies))
+
+    @pytest.mark.parametrize(
+        "request_source",
+        [
+            "valid_online_score_request.json",
+            {
+                "account": "horns&hoofs",
+                "login": "h&f",
+                "method": "online_score",
+                "arguments": {"phone": "79175002040", "email": "otus@otus.ru"},
+            },
+        ],
+    )
+    def test_valid_online_score(self, request_source):
+        response = self.make_request(request_source)
+
+        assert response["code"] == api.OK
+        assert "score" in response["response"]
+        assert response["response"]["score"] >= 0
+
+    @pytest.mark.parametrize(
+        "request_source",
+        [
+            "invalid_online_score_request.json",
+            {
+                "account": "horns&hoofs",
+                "login": "h&f",
+                "method": "online_score",
+                "arguments": {"phone": "notaphone", "email": "testexample.com"},
+            },
+        ],
+    )
+    def test_invalid_online_score(self, request_source):
+        response = self.make_request(request_source)
+
+        assert response["code"] != api.OK
+        assert "error" in response
 
-        self.assertNotEqual(response["code"], api.OK)
-        self.assertIn("error", response)
+    def test_valid_clients_interests(self):
+        expected_response = load_fixture(
+            "response", "expected_clients_interests_response.json"
+        )
 
+        response = self.make_request("valid_clients_interests_request.json")
 
-if __name__ == "__main__":
-    unittest.main()
+        assert response["code"] == expected_response["code"]
+        assert len(response["response"]) == len(expected_response["response"])
+        for cid, interests in response["response"].items():
+            assert cid in expected_response["response"]
+            assert interests == expected_response["response"][cid]
+
+    @pytest.mark.parametrize(
+        "request_source",
+        [
+            "invalid_clients_interests_request.json",
+            {
+                "account": "horns&hoofs",
+                "login": "h&f",
+                "method": "clients_interests",
+                "arguments": {"client_ids": [], "date": "32.13.2020"},
+            },
+        ],
+    )
+    def test_invalid_clients_interests(self, request_source):
+        response = self.make_request(request_source)
+
+        assert response["code"] != api.OK
+        assert "error" in response
+
+    def test_concurrent_online_score(self):
+        responses = self.dispatch(["valid_online_score_request.json"] * 8)
+
+        for response in responses:
+            assert response["code"] == api.OK
+            assert response["response"]["score"] >= 0
@@ -34,16 +34,17 @@ class TestSuite(unittest.TestCase):
 
     def set_valid_auth(self, request):
         if request.get("login") == api.ADMIN_LOGIN:
-            request["token"] = hashlib.sha512(
+            request["token"] = hashlib.blake2b(
                 (datetime.datetime.now().strftime("%Y%m%d%H") + api.ADMIN_SALT).encode(
                     "utf-8"
-                )
+                ),
+                digest_size=64,
             ).hexdigest()
         else:
             msg = (
                 request.get("account", "") + request.get("login", "") + api.SALT
             ).encode("utf-8")
-            request["token"] = hashlib.sha512(msg).hexdigest()
+            request["token"] = hashlib.blake2b(msg, digest_size=64).hexdigest()
 
     @cases(
         [